@@ -0,0 +1,198 @@
+import os
+from pathlib import Path
+
+import librosa
+import numpy as np
+from scipy.ndimage import median_filter
+import soundfile as sf
+import yt_dlp
+
+# CREPE's network operates on 16 kHz audio; resampling the stem to this rate
+# decimates it once up front and lets crepe skip its own (slow) resampling.
+CREPE_SAMPLE_RATE = 16000
+
+def download_video(url, output_path, progress_callback=None):
+    def progress_hook(d):
+        if d['status'] == 'downloading' and progress_callback:
+            try:
+                percent = d.get('_percent_str', '0%').replace('%', '')
+                progress_callback(int(float(percent)))
+            except ValueError:
+                pass  # Ignore if we can't convert the percentage to a number
+
+    ydl_opts = {
+        "format": "bestaudio/best",
+        "outtmpl": os.path.join(output_path, "downloads", "%(title)s.%(ext)s"),
+        "noplaylist": True,
+        # Extract straight to PCM WAV: the samples are decoded again right
+        # away, so a lossy mp3 encode would only cost time and quality
+        "postprocessors": [
+            {
+                "key": "FFmpegExtractAudio",
+                "preferredcodec": "wav",
+            }
+        ],
+        "progress_hooks": [progress_hook],
+    }
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=True)
+            filename = ydl.prepare_filename(info)
+            final_filename = os.path.splitext(filename)[0] + ".wav"
+            if os.path.exists(final_filename):
+                return final_filename
+            else:
+                return f"Error: File not found after download: {final_filename}"
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+# Whether TensorFlow has been imported and its GPUs set up. This has to
+# happen once, before the first model initialises the devices.
+_TF_CONFIGURED = False
+
+
+def _configure_tensorflow():
+    # TensorFlow, Spleeter and CREPE are imported on first use rather than at
+    # module level, so the CLI and the YIN path don't load CREPE, and nothing
+    # pays for TensorFlow until a model actually runs
+    global _TF_CONFIGURED
+    if _TF_CONFIGURED:
+        return
+    import tensorflow as tf
+
+    # Let TensorFlow allocate GPU memory as it needs it rather than reserving
+    # the whole device up front, so Spleeter and CREPE can share it
+    for gpu in tf.config.list_physical_devices('GPU'):
+        tf.config.experimental.set_memory_growth(gpu, True)
+    _TF_CONFIGURED = True
+
+
+# Loaded Spleeter models, keyed by configuration. Building a Separator loads
+# the model graph, which costs far more than separating a single track.
+_SEPARATORS = {}
+
+
+def _get_separator(params='spleeter:4stems'):
+    if params not in _SEPARATORS:
+        _configure_tensorflow()
+        from spleeter.separator import Separator
+
+        _SEPARATORS[params] = Separator(params)
+    return _SEPARATORS[params]
+
+
+def isolate_bass(input_files, params='spleeter:4stems', names=None):
+    separator = _get_separator(params)
+    output_dir = 'output'
+    if names is None:
+        names = [os.path.splitext(os.path.basename(input_file))[0] for input_file in input_files]
+    # Run every file through the one loaded model, with its stems going to
+    # output/<name>/. Each file is separated and written synchronously, so a
+    # failure in either step is caught here and reported in place of its
+    # path, as download_video does, without aborting the rest of the batch.
+    bass_files = []
+    for input_file, name in zip(input_files, names):
+        destination = os.path.join(output_dir, name)
+        try:
+            separator.separate_to_file(input_file, destination, filename_format='{instrument}.{codec}')
+        except Exception as e:
+            bass_files.append(f"Error: {str(e)}")
+        else:
+            bass_files.append(os.path.join(destination, 'bass.wav'))
+    return bass_files
+
+
+def load_bass(audio_path):
+    # Spleeter writes WAV, which libsndfile reads directly into float32
+    # without going through audioread
+    try:
+        audio, sr = sf.read(audio_path, dtype='float32', always_2d=False)
+    except RuntimeError:
+        # Fall back to librosa for formats libsndfile can't open
+        return librosa.load(audio_path, sr=CREPE_SAMPLE_RATE, dtype=np.float32)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1, dtype=np.float32)
+    if sr != CREPE_SAMPLE_RATE:
+        audio = librosa.resample(audio, orig_sr=sr, target_sr=CREPE_SAMPLE_RATE)
+    return audio, CREPE_SAMPLE_RATE
+
+
+def detect_pitches(audio, sr, model_capacity='tiny', step_size=20, min_confidence=0.5):
+    # An isolated bass line is monophonic, so a short median filter over the
+    # per-frame argmax is about as smooth as Viterbi decoding at a fraction
+    # of the cost
+    _configure_tensorflow()
+    import crepe
+
+    _, frequency, confidence, _ = crepe.predict(
+        audio, sr=sr, model_capacity=model_capacity, step_size=step_size, viterbi=False
+    )
+    frequency = median_filter(frequency, size=5)
+    # Low-confidence frames are silence or noise between notes
+    frequency = np.where(confidence >= min_confidence, frequency, np.nan)
+    return frequency
+
+
+def detect_pitches_yin(audio, sr, step_size=20, fmin=30, fmax=400, relative_db=-40, silence_db=-60):
+    # Time-domain YIN is far cheaper than running the CREPE network and is
+    # accurate enough for an isolated, monophonic bass line. The hop is the
+    # same step size in milliseconds as CREPE so both produce the same tab density.
+    hop_length = sr * step_size // 1000
+    f0 = librosa.yin(audio, fmin=fmin, fmax=fmax, sr=sr, frame_length=2048, hop_length=hop_length)
+    # YIN reports a pitch for every frame, even in silence, so gate on
+    # loudness: frames more than relative_db below the loudest frame, or
+    # below silence_db full scale, are treated as no note
+    rms = librosa.feature.rms(y=audio, frame_length=2048, hop_length=hop_length)[0]
+    threshold = max(rms.max() * 10 ** (relative_db / 20), 10 ** (silence_db / 20))
+    frequency = np.where(rms > threshold, f0, np.nan)
+    return frequency
+
+
+def build_tab(midi_notes, max_width):
+    # Map MIDI notes to bass guitar strings and frets
+    # Standard bass tuning: E1 (40), A1 (45), D2 (50), G2 (55)
+    string_notes = [40, 45, 50, 55]  # MIDI note numbers for open strings
+
+    spacing = 3  # Spacing between notes
+
+    # Preallocate one row of dash bytes per string and write frets in place,
+    # instead of growing and re-slicing Python strings for every note
+    tab = np.full((4, len(midi_notes) * spacing), ord('-'), dtype=np.uint8)
+
+    # Find the string and fret for every note at once: check strings from the
+    # highest open note down and take the first with a fret in range
+    strings_high_to_low = np.array(string_notes[::-1])
+    candidates = np.rint(midi_notes[:, None] - strings_high_to_low[None, :])
+    valid = (candidates >= 0) & (candidates <= 24)  # Typical bass fret range
+    first = valid.argmax(axis=1)
+    notes = np.flatnonzero(valid.any(axis=1))
+    frets = candidates[notes, first[notes]].astype(int)
+    strings = len(string_notes) - 1 - first[notes]
+
+    # Replace dashes with fret numbers, looking up each fret's padded label
+    fret_labels = np.array(
+        [np.frombuffer(str(fret).ljust(spacing, '-').encode(), dtype=np.uint8) for fret in range(25)]
+    )
+    columns = notes[:, None] * spacing + np.arange(spacing)
+    tab[strings[:, None], columns] = fret_labels[frets]
+
+    # Split the tab lines according to the maximum width, slicing each
+    # segment straight out of the byte buffer
+    output_lines = []
+    total_length = tab.shape[1]
+
+    for start in range(0, total_length, max_width):
+        end = start + max_width
+        # Build tab lines for the current segment
+        for label, row in zip([b'G|', b'D|', b'A|', b'E|'], tab[:, start:end]):
+            output_lines.append(label + row.tobytes())
+        output_lines.append(b'')  # Add an empty line between segments
+
+    # The tab is plain ASCII, so it stays as bytes and is written without a
+    # separate encode pass
+    return b'\n'.join(output_lines)
+
+
+def write_tab(path, content):
+    Path(path).write_bytes(content)